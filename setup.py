@@ -0,0 +1,43 @@
+"""Build script that optionally compiles the translator's hot path with Cython.
+
+The modules are plain Python, so the package still works if Cython is missing
+or compilation fails; the compiled extensions simply shadow the ``.py`` files
+when they are available.
+"""
+
+from setuptools import Extension, setup
+from setuptools.command.build_ext import build_ext
+
+# main.py stays pure Python: `python -m vm_translator.main` needs its code object to run.
+COMPILED_MODULES = [
+    "src/vm_translator/code_writer.py",
+    "src/vm_translator/parser.py",
+]
+
+
+class OptionalBuildExt(build_ext):
+    """build_ext that falls back to the pure-Python modules on failure."""
+
+    def run(self) -> None:
+        """Build the extensions, ignoring a missing compiler."""
+        try:
+            super().run()
+        except Exception as e:  # noqa: BLE001
+            print(f"Cython build failed, using pure Python modules: {e}")  # noqa: T201
+
+    def build_extension(self, ext: Extension) -> None:
+        """Build one extension, ignoring compile errors."""
+        try:
+            super().build_extension(ext)
+        except Exception as e:  # noqa: BLE001
+            print(f"Cython build of {ext.name} failed, using pure Python module: {e}")  # noqa: T201
+
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize(COMPILED_MODULES, language_level=3, quiet=True)
+
+setup(ext_modules=ext_modules, cmdclass={"build_ext": OptionalBuildExt})
@@ -1,70 +1,119 @@
 """Code writer class."""
 
+from functools import lru_cache
 from pathlib import Path
 from types import TracebackType
-from typing import Optional, Self, TextIO, Type
+from typing import Callable, Dict, List, Optional, Self, TextIO, Tuple, Type
 
 from vm_translator.constants import (
     ARITHMETIC_TEMPLATES,
-    BASE_SEGMENTS,
     BOOTSTRAP_CODE,
+    CALL_SAVE_FRAME,
+    CALL_SET_ARG,
+    COMPARISON_TEMPLATES,
+    OUTPUT_BUFFER_SIZE,
     POP_BASE_SEGMENTS_TEMPLATE,
     POP_TEMPLATE,
     PUSH_BASE_SEGMENTS_TEMPLATE,
     PUSH_TEMPLATE,
+    PUSH_ZERO_TEMPLATE,
+    RETURN_TEMPLATE,
     SEGMENT_MAP,
+    SEGMENT_SIZES,
     CommandType,
 )
 
+# Pre-rendered decimal strings for the small comparison label ids that dominate real programs.
+_INT_STR_SIZE = 4096
+_INT_STR = tuple(str(i) for i in range(_INT_STR_SIZE))
+
 
 class CodeWriter:
     """Context manager code writer class."""
 
-    def __init__(self, output_path: Path) -> None:
-        """CodeWriter Constructor."""
+    def __init__(self, output_path: Optional[Path] = None) -> None:
+        """CodeWriter Constructor.
+
+        Args:
+            output_path: File the assembly is written to; omit it to only render() the output.
+        """
         self.file: Optional[TextIO] = None
         self.ouput_path = output_path
         self.label_counter = 0
+        self.label_prefix = ""
         self.current_file = ""
         self.function_name = ""
+        self.label_scope = "$"
+        self.push_static_parts = self.pop_static_parts = ("", "", "")
+        # Emitted snippets, each ending in a newline; they are joined with blank lines on flush.
+        self._chunks: List[str] = []
+        self._w: Callable[[str], None] = self._chunks.append
 
     def __enter__(self) -> Self:
         """CodeWriter context enter method."""
-        self.file = self.ouput_path.open("w")
+        if self.ouput_path is None:
+            msg = "CodeWriter needs an output path to be opened"
+            raise ValueError(msg)
+        self.file = self.ouput_path.open("w", encoding="ascii", buffering=OUTPUT_BUFFER_SIZE, newline="\n")
         return self
 
-    def set_source_filename(self, name: str) -> None:
-        """Set filename."""
-        self.ource_filename = name
-
     def __exit__(
         self, _type: Optional[Type[BaseException]], _value: Optional[BaseException], _traceback: Optional[TracebackType]
     ) -> None:
         """CodeWriter Context exit method."""
+        if _type is None:
+            self.flush()
         if self.file:
             self.file.close()
 
-    def set_filename(self, filename: str) -> None:
-        """Set the current VM file being processed."""
-        self.current_file = filename.stem  # TODO stem is invalid may be trying to get the name without extension
+    def flush(self) -> None:
+        """Write the buffered assembly to the output file."""
+        if self.file and self._chunks:
+            self.file.write(self.render())
 
-    def _write(self, text: str) -> None:
+    def render(self) -> str:
+        """Return the buffered assembly as text and clear the buffer."""
+        if not self._chunks:
+            return ""
+        self._chunks.append("")
+        text = "\n".join(self._chunks)
+        self._chunks.clear()
+        return text
+
+    def write_rendered(self, text: str) -> None:
+        """Append assembly already rendered by another CodeWriter."""
+        self.flush()
         if self.file:
-            self.file.write(text.strip() + "\n\n")
+            self.file.write(text)
+
+    def set_filename(self, filename: Path) -> None:
+        """Set the current VM file being processed."""
+        self.current_file = filename.stem
+        # Labels are numbered per file so files can be translated independently (and in parallel).
+        self.label_counter = 0
+        self.label_prefix = self.current_file + "."
+        # Nothing carries over from the previous file's last function.
+        self.function_name = ""
+        self.label_scope = "$"
+        # Bake the file name into the static snippets once instead of on every static push/pop.
+        self.push_static_parts = _bind_static(_PUSH_STATIC, self.current_file)
+        self.pop_static_parts = _bind_static(_POP_STATIC, self.current_file)
 
     def write_init(self) -> None:
         """Writes the VM initialization code and bootstraps the program by calling Sys.init."""
-        self._write(BOOTSTRAP_CODE)
+        self._w(BOOTSTRAP_CODE)
         self.write_call("Sys.init", 0)
 
     def writer_arithmetic(self, command: str) -> None:
         """Writes assembly code for arithmetic commands."""
-        if command in {"eq", "gt", "lt"}:
-            self.label_counter += 1
-            asm = ARITHMETIC_TEMPLATES[command].format(self.label_counter)
+        parts = COMPARISON_TEMPLATES.get(command)
+        if parts is None:
+            self._w(ARITHMETIC_TEMPLATES[command])
         else:
-            asm = ARITHMETIC_TEMPLATES[command]
-        self._write(f"//{command}\n{asm}\n")
+            self.label_counter += 1
+            counter = self.label_counter
+            label = self.label_prefix + (_INT_STR[counter] if counter < _INT_STR_SIZE else str(counter))
+            self._w(label.join(parts))
 
     def write_push_pop(
         self,
@@ -78,130 +127,142 @@ class CodeWriter:
             command: The command type (push or pop)
             segment: Memory segment
             index: Memory index
+
+        Raises:
+            ValueError: If the segment or index is not valid for the command.
         """
-        if command == CommandType.C_PUSH:
-            self._handle_push(segment, index)
-        else:
-            self._handle_pop(segment, index)
-
-    def _handle_push(self, segment: str, index: int) -> None:
-        if segment == "constant":
-            self._write(f"// push constant {index}\n@{index}\nD=A\n{PUSH_TEMPLATE}")
-        elif segment == "static":
-            self._write(f"// push static {index}\n@{self.current_file}.{index}\nD=M\n{PUSH_TEMPLATE}")
-        elif segment in BASE_SEGMENTS:
-            self._write(PUSH_BASE_SEGMENTS_TEMPLATE.format(index, SEGMENT_MAP[segment]))
-        elif segment == "temp":
-            self._write(f"// push temp {index}\n@{5 + index}\nD=M\n{PUSH_TEMPLATE}")
-        elif segment == "pointer":
-            self._write(f"// push pointer {index}\n@{'THIS' if index == 0 else 'THAT'}\nD=M\n{PUSH_TEMPLATE}")
-
-    def _handle_pop(self, segment: str, index: int) -> None:
-        if segment == "static":
-            self._write(f"// pop static {index}\n{POP_TEMPLATE}@{self.current_file}.{index}\nM=D\n")
-        elif segment in BASE_SEGMENTS:
-            self._write(POP_BASE_SEGMENTS_TEMPLATE.format(index, SEGMENT_MAP[segment]))
-        elif segment == "temp":
-            self._write(f"// pop temp {index}\n{POP_TEMPLATE}@{5 + index}\nM=D\n")
-        elif segment == "pointer":
-            self._write(f"// pop pointer {index}\n{POP_TEMPLATE}@{'THIS' if index == 0 else 'THAT'}\nM=D\n")
+        is_push = command is CommandType.C_PUSH
+        handler = (PUSH_HANDLERS if is_push else POP_HANDLERS).get(segment)
+        size = SEGMENT_SIZES.get(segment)
+        if handler is None or index < 0 or (size is not None and index >= size):
+            msg = f"Invalid command: {'push' if is_push else 'pop'} {segment} {index}"
+            raise ValueError(msg)
+        self._w(handler(self, index))
 
     def write_label(self, label: str) -> None:
         """Label method."""
-        self._write(f"({self.function_name}${label})\n")
+        self._w(f"({self.label_scope}{label})\n")
 
     def write_goto(self, label: str) -> None:
         """GOTO method."""
-        self._write(f"// goto {label}\n@{self.function_name}${label}\n0;JMP\n")
+        self._w(f"// goto {label}\n@{self.label_scope}{label}\n0;JMP\n")
 
     def write_if(self, label: str) -> None:
         """IF method."""
-        self._write(f"// if-goto {label}\n{POP_TEMPLATE}@{self.function_name}${label}\nD;JNE\n")
+        self._w(f"// if-goto {label}\n{POP_TEMPLATE}@{self.label_scope}{label}\nD;JNE\n")
 
     def write_function(self, fn_name: str, n_vars: int) -> None:
         """Function declaration method."""
         self.function_name = fn_name
-        self._write(f"({fn_name})\n")
-        for _ in range(n_vars):
-            self.write_push_pop(CommandType.C_PUSH, "constant", 0)
+        # Labels inside a function are scoped as `fn_name$label`.
+        self.label_scope = fn_name + "$"
+        self._w(f"({fn_name})\n")
+        if n_vars:
+            self._chunks.extend([PUSH_ZERO_TEMPLATE] * n_vars)
 
     def write_call(self, fn_name: str, n_args: int) -> None:
         """Function call method."""
-        return_label = f"RETURN_{fn_name}_{self.label_counter}"
+        # `<file>.RET.<n>`: file names are identifiers, so this cannot run into another file's labels.
+        return_label = f"{self.label_prefix}RET.{self.label_counter}"
         self.label_counter += 1
-        self._write(f"""// call {fn_name} {n_args}
-        @{return_label}
-        D=A
-        {PUSH_TEMPLATE}
-        @LCL
-        D=M
-        {PUSH_TEMPLATE}
-        @ARG
-        D=M
-        {PUSH_TEMPLATE}
-        @THIS
-        D=M
-        {PUSH_TEMPLATE}
-        @THAT
-        D=M
-        {PUSH_TEMPLATE}
-        @SP
-        D=M
-        @5
-        D=D-A
-        @{n_args}
-        D=D-A
-        @ARG
-        M=D
-        @SP
-        D=M
-        @LCL
-        M=D
-        @{fn_name}
-        0;JMP
-        ({return_label})
-        """)
+        self._w(
+            f"// call {fn_name} {n_args}\n@{return_label}\n{CALL_SAVE_FRAME}"
+            f"@{n_args}\n{CALL_SET_ARG}@{fn_name}\n0;JMP\n({return_label})\n"
+        )
 
     def write_return(self) -> None:
         """Return method."""
-        self._write(f"""// return
-        @LCL
-        D=M
-        @R14
-        M=D
-        @5
-        A=D-A
-        D=M
-        @R15
-        M=D
-        {POP_TEMPLATE}
-        @ARG
-        A=M
-        M=D
-        D=A+1
-        @SP
-        M=D
-        @R14
-        AM=M-1
-        D=M
-        @THAT
-        M=D
-        @R14
-        AM=M-1
-        D=M
-        @THIS
-        M=D
-        @R14
-        AM=M-1
-        D=M
-        @ARG
-        M=D
-        @R14
-        AM=M-1
-        D=M
-        @LCL
-        M=D
-        @R15
-        A=M
-        0;JMP
-        """)
+        self._w(RETURN_TEMPLATE)
+
+
+# Invariant pieces of the fixed-segment snippets; the handlers only splice in the index.
+_PUSH_CONSTANT = ("// push constant ", "\n@", "\nD=A\n" + PUSH_TEMPLATE)
+_PUSH_STATIC = ("// push static ", "\n@", ".", "\nD=M\n" + PUSH_TEMPLATE)
+_PUSH_POINTER = (
+    "// push pointer 0\n@THIS\nD=M\n" + PUSH_TEMPLATE,
+    "// push pointer 1\n@THAT\nD=M\n" + PUSH_TEMPLATE,
+)
+_POP_STATIC = ("// pop static ", "\n" + POP_TEMPLATE + "@", ".", "\nM=D\n")
+_POP_POINTER = (
+    "// pop pointer 0\n" + POP_TEMPLATE + "@THIS\nM=D\n",
+    "// pop pointer 1\n" + POP_TEMPLATE + "@THAT\nM=D\n",
+)
+
+
+@lru_cache(maxsize=1 << 15)
+def _constant_snippet(index: int) -> str:
+    # Constants repeat heavily (0 and 1 above all); the cache holds every valid Hack constant (0-32767).
+    return str(index).join(_PUSH_CONSTANT)
+
+
+def _push_constant(_writer: CodeWriter, index: int) -> str:
+    return _constant_snippet(index)
+
+
+def _bind_static(parts: Tuple[str, str, str, str], filename: str) -> Tuple[str, str, str]:
+    return parts[0], parts[1] + filename + parts[2], parts[3]
+
+
+def _push_static(writer: CodeWriter, index: int) -> str:
+    return str(index).join(writer.push_static_parts)
+
+
+def _push_temp(_writer: CodeWriter, index: int) -> str:
+    return f"// push temp {index}\n@{5 + index}\nD=M\n{PUSH_TEMPLATE}"
+
+
+def _push_pointer(_writer: CodeWriter, index: int) -> str:
+    return _PUSH_POINTER[index]
+
+
+def _pop_static(writer: CodeWriter, index: int) -> str:
+    return str(index).join(writer.pop_static_parts)
+
+
+def _pop_temp(_writer: CodeWriter, index: int) -> str:
+    return f"// pop temp {index}\n{POP_TEMPLATE}@{5 + index}\nM=D\n"
+
+
+def _pop_pointer(_writer: CodeWriter, index: int) -> str:
+    return _POP_POINTER[index]
+
+
+def _push_base(segment: str) -> Callable[[CodeWriter, int], str]:
+    suffix = PUSH_BASE_SEGMENTS_TEMPLATE.format(segment=segment)
+
+    def handler(_writer: CodeWriter, index: int) -> str:
+        return f"@{index}{suffix}"
+
+    return handler
+
+
+def _pop_base(segment: str) -> Callable[[CodeWriter, int], str]:
+    suffix = POP_BASE_SEGMENTS_TEMPLATE.format(segment=segment)
+
+    def handler(_writer: CodeWriter, index: int) -> str:
+        return f"@{index}{suffix}"
+
+    return handler
+
+
+# Segment name -> assembly builder, so push/pop dispatch is a single dict lookup.
+PUSH_HANDLERS: Dict[str, Callable[[CodeWriter, int], str]] = {
+    "constant": _push_constant,
+    "static": _push_static,
+    "temp": _push_temp,
+    "pointer": _push_pointer,
+    "local": _push_base(SEGMENT_MAP["local"]),
+    "argument": _push_base(SEGMENT_MAP["argument"]),
+    "this": _push_base(SEGMENT_MAP["this"]),
+    "that": _push_base(SEGMENT_MAP["that"]),
+}
+
+POP_HANDLERS: Dict[str, Callable[[CodeWriter, int], str]] = {
+    "static": _pop_static,
+    "temp": _pop_temp,
+    "pointer": _pop_pointer,
+    "local": _pop_base(SEGMENT_MAP["local"]),
+    "argument": _pop_base(SEGMENT_MAP["argument"]),
+    "this": _pop_base(SEGMENT_MAP["this"]),
+    "that": _pop_base(SEGMENT_MAP["that"]),
+}
@@ -1,9 +1,9 @@
 """Constants and enums."""
 
-from enum import StrEnum, auto
+from enum import IntEnum, auto
 
 
-class CommandType(StrEnum):
+class CommandType(IntEnum):
     """Command type enum."""
 
     C_ARITHMETIC = auto()
@@ -19,7 +19,9 @@ class CommandType(StrEnum):
 
 ARITHMETIC_COMMANDS = frozenset({"add", "sub", "neg", "eq", "gt", "lt", "and", "or", "not"})
 
+# VM keyword -> command type, arithmetic ops included so classifying a command is one lookup.
 COMMAND_TYPE_MAP = {
+    **dict.fromkeys(ARITHMETIC_COMMANDS, CommandType.C_ARITHMETIC),
     "push": CommandType.C_PUSH,
     "pop": CommandType.C_POP,
     "label": CommandType.C_LABEL,
@@ -30,8 +32,6 @@ COMMAND_TYPE_MAP = {
     "call": CommandType.C_CALL,
 }
 
-BASE_SEGMENTS = frozenset({"local", "argument", "this", "that"})
-
 SEGMENT_MAP = {
     "local": "LCL",
     "argument": "ARG",
@@ -43,48 +43,43 @@ SEGMENT_MAP = {
     "temp": "5",
 }
 
-ARITHMETIC_TEMPLATES = {
-    "add": "@SP\nAM=M-1\nD=M\nA=A-1\nM=D+M",
-    "sub": "@SP\nAM=M-1\nD=M\nA=A-1\nM=M-D",
-    "neg": "@SP\nA=M-1\nM=-M",
-    "eq": "@SP\nAM=M-1\nD=M\nA=A-1\nD=M-D\n@JUMP_{0}\nD;JEQ\n@SP\nA=M-1\nM=0\n@CONTINUE_{0}\n0;JMP\n(JUMP_{0})\n@SP\nA=M-1\nM=-1\n(CONTINUE_{0})",
-    "gt": "@SP\nAM=M-1\nD=M\nA=A-1\nD=M-D\n@JUMP_{0}\nD;JGT\n@SP\nA=M-1\nM=0\n@CONTINUE_{0}\n0;JMP\n(JUMP_{0})\n@SP\nA=M-1\nM=-1\n(CONTINUE_{0})",
-    "lt": "@SP\nAM=M-1\nD=M\nA=A-1\nD=M-D\n@JUMP_{0}\nD;JLT\n@SP\nA=M-1\nM=0\n@CONTINUE_{0}\n0;JMP\n(JUMP_{0})\n@SP\nA=M-1\nM=-1\n(CONTINUE_{0})",
-    "and": "@SP\nAM=M-1\nD=M\nA=A-1\nM=D&M",
-    "or": "@SP\nAM=M-1\nD=M\nA=A-1\nM=D|M",
-    "not": "@SP\nA=M-1\nM=!M",
+# Number of registers in the fixed-size segments; indexes past these would clobber other RAM.
+SEGMENT_SIZES = {
+    "pointer": 2,
+    "temp": 8,
 }
 
+# Comparison commands split around their label id, so the emitted assembly
+# (comment header included) is just ``str(label_id).join(parts)``.
+COMPARISON_TEMPLATES = {
+    command: (
+        f"//{command}\n@SP\nAM=M-1\nD=M\nA=A-1\nD=M-D\n@JUMP_",
+        f"\nD;{jump}\n@SP\nA=M-1\nM=0\n@CONTINUE_",
+        "\n0;JMP\n(JUMP_",
+        ")\n@SP\nA=M-1\nM=-1\n(CONTINUE_",
+        ")\n",
+    )
+    for command, jump in (("eq", "JEQ"), ("gt", "JGT"), ("lt", "JLT"))
+}
 
-BOOTSTRAP_CODE = """@256
-D=A
-@SP
-M=D
-"""
+ARITHMETIC_TEMPLATES = {
+    command: f"//{command}\n{asm}\n"
+    for command, asm in (
+        ("add", "@SP\nAM=M-1\nD=M\nA=A-1\nM=D+M"),
+        ("sub", "@SP\nAM=M-1\nD=M\nA=A-1\nM=M-D"),
+        ("neg", "@SP\nA=M-1\nM=-M"),
+        ("and", "@SP\nAM=M-1\nD=M\nA=A-1\nM=D&M"),
+        ("or", "@SP\nAM=M-1\nD=M\nA=A-1\nM=D|M"),
+        ("not", "@SP\nA=M-1\nM=!M"),
+    )
+}
 
-PUSH_BASE_SEGMENTS_TEMPLATE = """@{0}
-D=A
-@{1}
-A=D+M
-D=M
-@SP
-A=M
-M=D
-@SP
-M=M+1
-"""
+# Large write buffer so the emitted assembly reaches the OS in a few big writes.
+OUTPUT_BUFFER_SIZE = 1 << 20
 
-POP_BASE_SEGMENTS_TEMPLATE = """@{0}
+BOOTSTRAP_CODE = """@256
 D=A
-@{1}
-D=D+M
-@R13
-M=D
 @SP
-AM=M-1
-D=M
-@R13
-A=M
 M=D
 """
 
@@ -92,3 +87,35 @@ M=D
 PUSH_TEMPLATE = "@SP\nA=M\nM=D\n@SP\nM=M+1\n"
 
 POP_TEMPLATE = "@SP\nAM=M-1\nD=M\n"
+
+# `push constant 0` storing 0 directly, used to zero-initialise a function's locals.
+PUSH_ZERO_TEMPLATE = "// push constant 0\n@SP\nA=M\nM=0\n@SP\nM=M+1\n"
+
+# Invariant middle of a call sequence: save the caller's frame after pushing the return address,
+# then reposition ARG; write_call splices the names and argument count in around them.
+CALL_SAVE_FRAME = (
+    f"D=A\n{PUSH_TEMPLATE}"
+    f"@LCL\nD=M\n{PUSH_TEMPLATE}"
+    f"@ARG\nD=M\n{PUSH_TEMPLATE}"
+    f"@THIS\nD=M\n{PUSH_TEMPLATE}"
+    f"@THAT\nD=M\n{PUSH_TEMPLATE}"
+    "@SP\nD=M\n@5\nD=D-A\n"
+)
+CALL_SET_ARG = "D=D-A\n@ARG\nM=D\n@SP\nD=M\n@LCL\nM=D\n"
+
+RETURN_TEMPLATE = (
+    "// return\n@LCL\nD=M\n@R14\nM=D\n@5\nA=D-A\nD=M\n@R15\nM=D\n"
+    f"{POP_TEMPLATE}"
+    "@ARG\nA=M\nM=D\nD=A+1\n@SP\nM=D\n"
+    "@R14\nAM=M-1\nD=M\n@THAT\nM=D\n"
+    "@R14\nAM=M-1\nD=M\n@THIS\nM=D\n"
+    "@R14\nAM=M-1\nD=M\n@ARG\nM=D\n"
+    "@R14\nAM=M-1\nD=M\n@LCL\nM=D\n"
+    "@R15\nA=M\n0;JMP\n"
+)
+
+# Everything after ``@<index>`` in a pointer-based segment push/pop; formatted
+# once per segment when the handler tables are built.
+PUSH_BASE_SEGMENTS_TEMPLATE = "\nD=A\n@{segment}\nA=D+M\nD=M\n" + PUSH_TEMPLATE
+
+POP_BASE_SEGMENTS_TEMPLATE = "\nD=A\n@{segment}\nD=D+M\n@R13\nM=D\n" + POP_TEMPLATE + "@R13\nA=M\nM=D\n"
@@ -1,15 +1,33 @@
 """Main entry point for the Hack vm-translator."""
 
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from enum import IntEnum
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, List, Tuple
 
 from vm_translator.cli import parse_args
 from vm_translator.code_writer import CodeWriter
 from vm_translator.constants import CommandType
 from vm_translator.parser import Parser
 
+# Below this much VM source, starting worker processes costs more than it saves.
+PARALLEL_MIN_BYTES = 1 << 20
+
+# Command type -> writer call taking the command's tokens.
+COMMAND_HANDLERS: Dict[CommandType, Callable[[CodeWriter, Tuple[str, ...]], None]] = {
+    CommandType.C_PUSH: lambda writer, args: writer.write_push_pop(CommandType.C_PUSH, args[1], int(args[2])),
+    CommandType.C_POP: lambda writer, args: writer.write_push_pop(CommandType.C_POP, args[1], int(args[2])),
+    CommandType.C_ARITHMETIC: lambda writer, args: writer.writer_arithmetic(args[0]),
+    CommandType.C_LABEL: lambda writer, args: writer.write_label(args[1]),
+    CommandType.C_GOTO: lambda writer, args: writer.write_goto(args[1]),
+    CommandType.C_IF: lambda writer, args: writer.write_if(args[1]),
+    CommandType.C_CALL: lambda writer, args: writer.write_call(args[1], int(args[2])),
+    CommandType.C_RETURN: lambda writer, _args: writer.write_return(),
+    CommandType.C_FUNCTION: lambda writer, args: writer.write_function(args[1], int(args[2])),
+}
+
 
 class ExitCode(IntEnum):
     """Exit code enum."""
@@ -57,25 +75,43 @@ def process_vm_file(vm_file: Path, writer: CodeWriter) -> None:
     """
     writer.set_filename(vm_file)
     with Parser(vm_file) as parser:
-        while parser.has_more_commands():
-            parser.advance()
-            cmd_type = parser.command_type
-            args = parser.args
-
-            if cmd_type == CommandType.C_ARITHMETIC:
-                writer.writer_arithmetic(args[0])
-            elif cmd_type == CommandType.C_RETURN:
-                writer.write_return()
-            elif cmd_type in (CommandType.C_PUSH, CommandType.C_POP):
-                writer.write_push_pop(cmd_type, args[1], int(args[2]))
-            elif cmd_type in (CommandType.C_LABEL, CommandType.C_GOTO, CommandType.C_IF):
-                writer.write_label(args[1]) if cmd_type == CommandType.C_LABEL else writer.write_goto(
-                    args[1]
-                ) if cmd_type == CommandType.C_GOTO else writer.write_if(args[1])
-            elif cmd_type == CommandType.C_FUNCTION:
-                writer.write_function(args[1], int(args[2]))
-            elif cmd_type == CommandType.C_CALL:
-                writer.write_call(args[1], int(args[2]))
+        for cmd_type, args in parser:
+            if cmd_type is not None:
+                COMMAND_HANDLERS[cmd_type](writer, args)
+    writer.flush()
+
+
+def usable_cpu_count() -> int:
+    """Return the number of CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def should_translate_in_parallel(files: List[Path]) -> bool:
+    """Decide whether translating the files in worker processes is worth it.
+
+    Args:
+        files: List of Path objects pointing to VM files
+
+    Returns:
+        True if there are several CPUs, several files and enough VM source to amortise the workers
+    """
+    return usable_cpu_count() > 1 and len(files) > 1 and sum(f.stat().st_size for f in files) >= PARALLEL_MIN_BYTES
+
+
+def translate_vm_file(vm_file: Path) -> str:
+    """Translate a single VM file to assembly text.
+
+    Args:
+        vm_file: Path to the VM file to translate
+
+    Returns:
+        The file's assembly, ready to be appended to the program output
+    """
+    writer = CodeWriter()
+    process_vm_file(vm_file, writer)
+    return writer.render()
 
 
 def main() -> ExitCode:
@@ -94,11 +130,18 @@ def main() -> ExitCode:
             if path.is_dir() and any(f.name == "Sys.vm" for f in vm_files):
                 writer.write_init()
 
-            for vm_file in prioritize_sys(vm_files):
-                process_vm_file(vm_file, writer)
+            vm_files = prioritize_sys(vm_files)
+            if should_translate_in_parallel(vm_files):
+                with ProcessPoolExecutor(max_workers=usable_cpu_count()) as executor:
+                    for asm in executor.map(translate_vm_file, vm_files):
+                        writer.write_rendered(asm)
+            else:
+                for vm_file in vm_files:
+                    process_vm_file(vm_file, writer)
 
             return ExitCode.SUCCESS
-    except ValueError:
+    except ValueError as e:
+        sys.stderr.write(f"{e}\n")
         return ExitCode.INVALID_ARGS
     except (FileNotFoundError, PermissionError) as e:
         error_msg = f"Error reading file {path}: {e}"
@@ -2,25 +2,69 @@
 
 from __future__ import annotations
 
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import TYPE_CHECKING, Optional, Self, Type
 
-from vm_translator.constants import ARITHMETIC_COMMANDS, COMMAND_TYPE_MAP, CommandType
+from vm_translator.constants import COMMAND_TYPE_MAP, CommandType
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
     from types import TracebackType
 
 
+def _read_source(file_path: Path) -> str:
+    """Read and decode a whole VM file."""
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        # A single read(2) may return less than asked for (Linux caps it just under 2 GiB).
+        while len(data) < size:
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data.decode("utf-8")
+    finally:
+        os.close(fd)
+
+
+def _strip_comments(source: str) -> Iterable[str]:
+    """Split source into lines with any ``//`` comment removed."""
+    lines = source.splitlines()
+    if "//" not in source:
+        return lines
+    return (line.partition("//")[0] for line in lines)
+
+
+@lru_cache(maxsize=4096)
+def _parse(command: str) -> tuple[Optional[CommandType], tuple[str, ...]]:
+    """Split a VM command into its tokens and classify it."""
+    args = tuple(command.split())
+    return COMMAND_TYPE_MAP.get(args[0]), args
+
+
 class Parser:
     """A context manager Parser class.
 
     It manages file handling and parses the vm code.
     """
 
+    # Fixed attribute layout: the cursor and token state are written once per command.
+    __slots__ = ("__args", "__commands", "__count", "__index", "__type")
+
     def __init__(self, file_path: Path) -> None:
         """Parser Constructor."""
-        self.__file = file_path.open()
-        self.current_command: Optional[str] = None
+        # Decoding the raw bytes in one go skips the text layer's incremental decoder and
+        # newline translation; splitlines() already handles "\r\n".
+        source = _read_source(file_path)
+        self.__commands = list(filter(None, map(str.strip, _strip_comments(source))))
+        self.__count = len(self.__commands)
+        self.__index = 0
+        self.__type: Optional[CommandType] = None
+        self.__args: tuple[str, ...] = ()
 
     def __enter__(self) -> Self:
         """Context manager enter method."""
@@ -29,9 +73,10 @@ class Parser:
     def __exit__(
         self, _type: Optional[Type[BaseException]], _value: Optional[BaseException], _traceback: Optional[TracebackType]
     ) -> None:
-        """Context manager exit method."""
-        if self.__file:
-            self.__file.close()
+        """Context manager exit method.
+
+        The source file is read and closed in the constructor, so there is nothing left to release.
+        """
 
     def has_more_commands(self) -> bool:
         """Check if there are more commands to process in the input file.
@@ -39,36 +84,49 @@ class Parser:
         Returns:
             bool: True if there are more commands, False otherwise.
         """
-        pos = self.__file.tell()
-        has_more = bool(self.__file.readline())
-        self.__file.seek(pos)
-        return has_more
+        return self.__index < self.__count
 
     def advance(self) -> None:
         """Read next line."""
-        while True:
-            line = self.__file.readline()
-            if not line:
-                self.current_command = None
-                return
-            line = line.partition("//")[0].strip()
-            if line:
-                self.current_command = line
-                return
+        if self.__index < self.__count:
+            self.__type, self.__args = _parse(self.__commands[self.__index])
+            self.__index += 1
+        else:
+            self.__type, self.__args = None, ()
+
+    def __iter__(self) -> Iterator[tuple[Optional[CommandType], tuple[str, ...]]]:
+        """Iterate over the remaining commands as parsed ``(command_type, args)`` pairs.
+
+        Yields:
+            tuple[Optional[CommandType], tuple[str, ...]]: The command type (None if unrecognised) and its tokens.
+        """
+        commands = self.__commands
+        for index in range(self.__index, self.__count):
+            self.__index = index + 1
+            parsed = _parse(commands[index])
+            self.__type, self.__args = parsed
+            yield parsed
+        # Same end state as advance() past the last command.
+        self.__type, self.__args = None, ()
+
+    @property
+    def current_command(self) -> Optional[str]:
+        """The current command, or None before the first or after the last one.
+
+        Only looked up on request; the hot path works from the parsed tokens.
+        """
+        return self.__commands[self.__index - 1] if self.__args else None
 
     @property
-    def command_type(self) -> CommandType:
+    def command_type(self) -> Optional[CommandType]:
         """Determine the command type from a given VM command string.
 
         Returns:
             CommandType enum value or None if invalid command
         """
-        cmd = self.current_command.split()[0]
-        if cmd in ARITHMETIC_COMMANDS:
-            return CommandType.C_ARITHMETIC
-        return COMMAND_TYPE_MAP.get(cmd)
+        return self.__type
 
     @property
-    def args(self) -> list[str]:
+    def args(self) -> tuple[str, ...]:
         """Get args."""
-        return self.current_command.split()
+        return self.__args
@@ -0,0 +1 @@
+"""Tests for vm_translator."""
@@ -0,0 +1,44 @@
+"""Tests for the code writer."""
+
+import re
+from pathlib import Path
+
+import pytest
+
+from vm_translator.code_writer import CodeWriter
+from vm_translator.constants import CommandType
+from vm_translator.main import process_vm_file
+
+
+def test_return_labels_unique_across_files_with_underscores(tmp_path: Path) -> None:
+    sources = {
+        "Main.vm": "function Main.a 0\npush constant 0\nreturn\nfunction Main.a_b 0\npush constant 0\nreturn\n",
+        "X.vm": "function X.f 0\ncall Main.a_b 0\nreturn\n",
+        "b_X.vm": "function b_X.f 0\ncall Main.a 0\nreturn\n",
+    }
+    writer = CodeWriter(tmp_path / "Prog.asm")
+    for name, source in sources.items():
+        vm_file = tmp_path / name
+        vm_file.write_text(source)
+        process_vm_file(vm_file, writer)
+
+    labels = re.findall(r"^\((.+)\)$", writer.render(), re.MULTILINE)
+    assert len(labels) == len(set(labels))
+
+
+@pytest.mark.parametrize(
+    ("command", "segment", "index"),
+    [
+        (CommandType.C_POP, "constant", 3),
+        (CommandType.C_PUSH, "pointer", 2),
+        (CommandType.C_PUSH, "foo", 1),
+        (CommandType.C_PUSH, "pointer", -1),
+        (CommandType.C_POP, "temp", 8),
+        (CommandType.C_PUSH, "temp", -1),
+        (CommandType.C_PUSH, "static", -1),
+        (CommandType.C_POP, "local", -1),
+    ],
+)
+def test_invalid_push_pop_raises_value_error(command: CommandType, segment: str, index: int) -> None:
+    with pytest.raises(ValueError, match=f"{segment} {index}"):
+        CodeWriter().write_push_pop(command, segment, index)
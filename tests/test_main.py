@@ -0,0 +1,35 @@
+"""Tests for the command-line driver."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from vm_translator import main as vm_main
+
+
+def _translate(path: Path, monkeypatch: pytest.MonkeyPatch, *, cpus: int) -> bytes:
+    monkeypatch.setattr(vm_main, "usable_cpu_count", lambda: cpus)
+    monkeypatch.setattr(vm_main, "PARALLEL_MIN_BYTES", 0)
+    assert vm_main.should_translate_in_parallel(vm_main.get_vm_files(path)) is (cpus > 1)
+    monkeypatch.setattr(sys, "argv", ["vm_translator", str(path)])
+    assert vm_main.main() == vm_main.ExitCode.SUCCESS
+    return path.with_name(f"{path.name}.asm").read_bytes()
+
+
+def test_parallel_output_matches_sequential(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    program = tmp_path / "Prog"
+    program.mkdir()
+    (program / "Sys.vm").write_text("function Sys.init 0\ncall Main.main 0\nlabel END\ngoto END\n")
+    (program / "Main.vm").write_text(
+        "function Main.main 1\npush constant 7\npush constant 8\nlt\npop local 0\n"
+        "push static 0\ncall Util.f 1\nreturn\n"
+    )
+    # A label before the first function must not pick up the previous file's function scope.
+    (program / "Util.vm").write_text(
+        "label TOP\nfunction Util.f 0\npush argument 0\npush temp 3\neq\nif-goto TOP\nreturn\n"
+    )
+
+    sequential = _translate(program, monkeypatch, cpus=1)
+    parallel = _translate(program, monkeypatch, cpus=2)
+    assert parallel == sequential
@@ -0,0 +1,23 @@
+"""Tests for the parser."""
+
+from pathlib import Path
+
+from vm_translator.parser import Parser
+
+
+def test_iteration_and_advance_leave_the_same_end_state(tmp_path: Path) -> None:
+    vm_file = tmp_path / "Main.vm"
+    vm_file.write_text("// comment\npush constant 1\n\nlabel END // trailing\n")
+
+    iterated = Parser(vm_file)
+    assert [args for _type, args in iterated] == [("push", "constant", "1"), ("label", "END")]
+
+    advanced = Parser(vm_file)
+    while advanced.has_more_commands():
+        advanced.advance()
+    advanced.advance()
+
+    for parser in (iterated, advanced):
+        assert parser.current_command is None
+        assert parser.command_type is None
+        assert parser.args == ()